@@ -32,20 +32,24 @@ def plot_route(problem: CVRPProblem, solution: CVRPSolution) -> Map:
         tiles="cartodbpositron",
     )
 
-    for i, route in enumerate(routes):
-        origin = (problem.coords[route[problem.depot_idx]][0], problem.coords[route[problem.depot_idx]][1])
-        folium.CircleMarker(origin, color="red", radius=2, weight=5).add_to(m)
+    locations = folium.FeatureGroup(name="Locations")
+    folium.CircleMarker(tuple(problem.coords[problem.depot_idx]), color="red", radius=2, weight=5).add_to(locations)
+    for c in problem.coords[1:]:
+        folium.CircleMarker(tuple(c), color="black", radius=1, weight=5).add_to(locations)
+    locations.add_to(m)
 
-        for c in problem.coords[1:]:
-            folium.CircleMarker(tuple(c), color="black", radius=1, weight=5).add_to(m)
+    for i, route in enumerate(routes):
+        vehicle_route = folium.FeatureGroup(name=f"Vehicle {i}")
 
         route_color = MAP_COLORS[i % len(MAP_COLORS)]
-        route_coords = [(problem.coords[idx][0], problem.coords[idx][1]) for idx in route]
-        folium.Polygon(
+        route_coords = problem.coords[route].tolist()
+        folium.PolyLine(
             route_coords,
             popup=f"Vehicle {i}",
             color=route_color,
             weight=2,
-        ).add_to(m)
+        ).add_to(vehicle_route)
+
+        vehicle_route.add_to(m)
 
     return m
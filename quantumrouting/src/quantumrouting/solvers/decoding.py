@@ -0,0 +1,42 @@
+from numba import njit
+
+
+@njit('int64(int8[:, ::1], float64[:, ::1], int32[::1], int64, int64, int64, '
+      'int32[:, ::1], float64[::1], int64[::1])', cache=True)
+def _decode_assignment(assignment, costs, demands, max_deliveries, num_vehicles, depot,
+                       routes, routes_cost, occupied_capacity):
+    """
+    Decode the (step, dest) assignment of a qubo sample into routes.
+
+    Each vehicle takes `max_deliveries` assigned steps, stays in depot are
+    skipped. Routes are written into `routes`, which must come filled with the
+    depot, and the cost and capacity occupied of each route are accumulated in
+    the same pass. Returns the number of decoded routes.
+    """
+    vehicle = 0
+    position = 0
+    step = 0
+    prev = depot
+
+    for s in range(assignment.shape[0]):
+        for dest in range(assignment.shape[1]):
+            if assignment[s, dest] != 1:
+                continue
+            if dest != depot:
+                position += 1
+                routes[vehicle, position] = dest
+                routes_cost[vehicle] += costs[prev, dest]
+                occupied_capacity[vehicle] += demands[dest]
+                prev = dest
+            step += 1
+            if step == max_deliveries:
+                # Back to depot
+                routes_cost[vehicle] += costs[prev, depot]
+                vehicle += 1
+                position = 0
+                step = 0
+                prev = depot
+                if vehicle >= num_vehicles:
+                    return vehicle
+
+    return vehicle
@@ -1,4 +1,4 @@
-from typing import Callable, List
+from typing import Callable
 
 import neal
 import numpy as np
@@ -7,11 +7,8 @@ from dataclasses import dataclass
 
 from dimod import SampleSet, Sampler
 
-from src.quantumrouting.solvers.utils import total_solution_cost, calculate_capacity_occupied
 from src.quantumrouting.types import CVRPProblem, CVRPSolution
 
-from src.quantumrouting.distances import compute_distances
-
 
 @dataclass
 class FullQuboParams:
@@ -30,8 +27,8 @@ def solver_fn(
         vrp_qubo = qubo_problem_fn(problem=problem)
 
         # Solve qubo
-        response = backend_solver.sample_qubo(vrp_qubo,
-                                              solver=neal.SimulatedAnnealingSampler())
+        response = backend_solver.sample(vrp_qubo,
+                                         solver=neal.SimulatedAnnealingSampler())
 
         return _unwrap_fullqubo_solution(problem=problem, result=response)
 
@@ -39,53 +36,37 @@ def solver_fn(
 
 
 def _unwrap_fullqubo_solution(problem: CVRPProblem, result: SampleSet) -> CVRPSolution:
+    # Imported here so that loading this module (e.g. for FullQuboParams) does not compile the kernel.
+    from src.quantumrouting.solvers.decoding import _decode_assignment
 
-    distances = compute_distances(coords=problem.coords)
+    distances = np.ascontiguousarray(problem.costs, dtype=np.float64)
 
     sample = list(result)[0]
 
-    all_vehicles_results = []
-    vehicle_result = []
-
-    vehicle = 0
-    step = 0
-
-    # Decoding solution from qubo sample.
-    for (s, dest) in sample:
-        if sample[(s, dest)] == 1:
-            if dest != 0:
-                vehicle_result.append(dest)
-            step += 1
-            if problem.max_deliveries == step:
-                # Add depot at begginning
-                vehicle_result.insert(0, problem.depot_idx)
-                # Add depot at ending
-                vehicle_result.append(problem.depot_idx)
-                all_vehicles_results.append(vehicle_result)
-                step = 0
-                vehicle += 1
-                vehicle_result = []
-                if problem.num_vehicles <= vehicle:
-                    break
-
-    # Calculate Cost and total capacity occupied in each vehicle
-    cost = total_solution_cost(
-        depot_idx=problem.depot_idx,
-        demands=problem.demands,
-        routes=all_vehicles_results,
-        cost_matrix=distances
-    )
+    num_nodes = len(problem.location_idx)
+    steps = problem.num_vehicles * problem.max_deliveries
 
-    occupied_capacity = calculate_capacity_occupied(
-        demands=problem.demands,
-        routes=all_vehicles_results
-    )
+    # Variables are flat (step, dest) indexes.
+    assignment = np.zeros((steps, num_nodes), dtype=np.int8)
+    for var, value in sample.items():
+        if value == 1:
+            assignment[divmod(var, num_nodes)] = 1
+
+    routes = np.full(
+        (problem.num_vehicles, problem.max_deliveries + 2), problem.depot_idx, dtype=np.int32)
+    routes_cost = np.zeros(problem.num_vehicles, dtype=np.float64)
+    occupied_capacity = np.zeros(problem.num_vehicles, dtype=np.int64)
+
+    num_routes = _decode_assignment(
+        assignment,
+        distances,
+        np.ascontiguousarray(problem.demands, dtype=np.int32),
+        problem.max_deliveries, problem.num_vehicles, problem.depot_idx,
+        routes, routes_cost, occupied_capacity)
 
     return CVRPSolution(
         problem_identifier=problem.problem_identifier,
-        routes=np.array(all_vehicles_results),
-        cost=cost,
-        total_demands=np.array(occupied_capacity)
+        routes=routes[:num_routes],
+        cost=routes_cost[:num_routes].sum(),
+        total_demands=occupied_capacity[:num_routes]
     )
-
-
@@ -6,10 +6,9 @@ import os
 import numpy as np
 from dataclasses import dataclass
 
+from src.quantumrouting.solvers.utils import total_solution_cost, calculate_capacity_occupied
 from src.quantumrouting.types import CVRPProblem, CVRPSolution
 
-from src.quantumrouting.distances import compute_distances
-
 
 @dataclass
 class LKHParams:
@@ -55,8 +54,6 @@ def _unwrap_lkh_solution(problem: CVRPProblem, solution: List[int]) -> CVRPSolut
     https://github.com/loggi/loggibud/blob/master/loggibud/v1/baselines/task1/lkh_3.py#L70
     """
 
-    distances = compute_distances(coords=problem.coords)
-
     sample_solution = solution[0]
     # Add depot at the end of solution
     sample_solution.append(sample_solution[0])
@@ -65,42 +62,37 @@ def _unwrap_lkh_solution(problem: CVRPProblem, solution: List[int]) -> CVRPSolut
     # Reindexing
     delivery_indices = np.array(solution[0]) - 1
 
-    # Now we split the sequence into vehicles using a simple generator.
-    def route_gen(seq):
-        route = [problem.depot_idx]
-        for el in seq[1:]:
-            if el <= num_deliveries:
-                route.append(el)
-
-            elif route:
-                route.append(problem.depot_idx)
-                yield np.array(route)
-                route = [problem.depot_idx]
-
-        # Output last route if any
-        if route:
-            yield np.array(route)
-
-    all_vehicles_results = list(route_gen(delivery_indices))
+    # Now we split the sequence into vehicles, indexes beyond the deliveries
+    # are the depot copies separating routes. Routes are padded with the depot.
+    # LKH only knows capacities, so a route may visit every delivery.
+    routes = np.full(
+        (problem.num_vehicles, len(problem.location_idx) + 1), problem.depot_idx, dtype=np.int32)
+    vehicle = 0
+    position = 0
+    for el in delivery_indices[1:]:
+        if el > num_deliveries:
+            vehicle += 1
+            position = 0
+        elif el != problem.depot_idx:
+            position += 1
+            routes[vehicle, position] = el
+
+    all_vehicles_results = routes[:vehicle + 1]
 
     # Calculate Cost and total capacity occupied in each vehicle
-    cost = 0
-    total_demands_size = []
-    for vehicle_route in all_vehicles_results:
-        demands_size = 0
-        if vehicle_route == []:
-            continue
-        prev = vehicle_route[0]
-        for dest in vehicle_route[1:]:
-            cost += distances[prev][dest]
-            demands_size += problem.demands[dest]
-            prev = dest
-        total_demands_size.append(demands_size)
-        cost += distances[prev][problem.depot_idx]
+    cost = total_solution_cost(
+        routes=all_vehicles_results,
+        cost_matrix=problem.costs
+    )
+
+    occupied_capacity = calculate_capacity_occupied(
+        demands=problem.demands,
+        routes=all_vehicles_results
+    )
 
     return CVRPSolution(
         problem_identifier=problem.problem_identifier,
-        routes=np.array(all_vehicles_results),
+        routes=all_vehicles_results,
         cost=cost,
-        total_demands=np.array(total_demands_size)
+        total_demands=occupied_capacity
     )
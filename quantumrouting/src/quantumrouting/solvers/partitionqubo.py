@@ -50,25 +50,20 @@ def solver_fn(params: KmeansPartitionFullQuboParams,
             for idxs in subproblems_idx
         ]
 
-        all_routes, all_costs, all_demands = [], 0, []
+        solutions = []
         for problem in subproblems:
              # Get qubo formulation problem
             vrp_qubo = qubo_problem_fn(problem=problem)
 
             # Solve qubo
-            response = backend_solver.sample_qubo(vrp_qubo, solver=neal.SimulatedAnnealingSampler())
-            solution = _unwrap_fullqubo_solution(problem=problem, result=response)
-            for route in solution.routes:
-                all_routes.append(route)
-            for demand in solution.total_demands:
-                all_demands.append(demand)
-            all_costs += solution.cost
+            response = backend_solver.sample(vrp_qubo, solver=neal.SimulatedAnnealingSampler())
+            solutions.append(_unwrap_fullqubo_solution(problem=problem, result=response))
 
         return CVRPSolution(
             problem_identifier=problem.problem_identifier,
-            routes=np.array(all_routes),
-            cost=all_costs,
-            total_demands=np.array(all_demands)
+            routes=np.concatenate([solution.routes for solution in solutions]),
+            cost=sum(solution.cost for solution in solutions),
+            total_demands=np.concatenate([solution.total_demands for solution in solutions])
         )
 
     return _solve
@@ -1,38 +1,19 @@
-from typing import List
-
 import numpy as np
 
 
 def calculate_capacity_occupied(
         demands: np.ndarray,
-        routes: List[List[int]],
-) -> List[int]:
-    total_capacity_occupied = []
-    for vehicle_route in routes:
-        demands_size = 0
-        for dest in vehicle_route[1:]:
-            demands_size += demands[dest]
-        total_capacity_occupied.append(demands_size)
-
-    return total_capacity_occupied
+        routes: np.ndarray,
+) -> np.ndarray:
+    return demands[routes[:, 1:]].sum(axis=1)
 
 
 def total_solution_cost(
-        depot_idx: int,
-        demands: np.ndarray,
-        routes: List[List[int]],
+        routes: np.ndarray,
         cost_matrix: np.ndarray
-) -> int:
-    cost = 0
-    for vehicle_route in routes:
-        demands_size = 0
-        if vehicle_route == []:
-            continue
-        prev = vehicle_route[0]
-        for dest in vehicle_route[1:]:
-            cost += cost_matrix[prev][dest]
-            demands_size += demands[dest]
-            prev = dest
-        cost += cost_matrix[prev][depot_idx]
-
-    return cost
+) -> float:
+    """
+    Total cost of the routes, which must start and end in the depot and be
+    padded with it, so padding edges cost nothing.
+    """
+    return cost_matrix[routes[:, :-1], routes[:, 1:]].sum()
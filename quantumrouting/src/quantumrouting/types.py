@@ -2,13 +2,15 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 import numpy as np
 
 from dataclasses import dataclass
 from random import sample, seed
 
+from src.quantumrouting.distances import compute_distances
+
 
 MAX_NUM_VEHICLES = 1
 
@@ -31,6 +33,12 @@ class CVRPProblem:
     """Maximum number of deliveries for each vehicle"""
     depot_idx: int = 0
     """Depot idx identifier"""
+    costs: Optional[np.ndarray] = None
+    """Distances between locations, computed from coords when not provided"""
+
+    def __post_init__(self):
+        if self.costs is None:
+            self.costs = compute_distances(coords=self.coords)
 
     @classmethod
     def from_file(cls, path: Union[Path, str], sample_frac: float = 0.015) -> CVRPProblem:
@@ -40,30 +48,28 @@ class CVRPProblem:
             data = json.load(f)
 
             packages = data['deliveries']
+            points = np.array([[p['point']['lat'], p['point']['lng']] for p in packages], dtype=np.float64)
+            sizes = np.array([p['size'] for p in packages], dtype=np.int32)
+
             # We are not able to solve big instances with a exact approach.
             # For now, I'm sampling results
             if sample_frac != 1:
                 seed(a=sample_frac, version=2)
                 total_packages = int(sample_frac*len(packages))
-                packages = sample(packages, total_packages)
-
-            coords = []
-            demands = []
-            for package_info in packages:
-                coords.append([package_info['point']['lat'], package_info['point']['lng']])
-                demands.append(package_info['size'])
+                sampled_idx = sample(range(len(packages)), total_packages)
+                points, sizes = points[sampled_idx], sizes[sampled_idx]
 
             origin = data['origin']
-            coords = [[origin['lat'], origin['lng']]] + coords
-            demands = [0] + demands
+            coords = np.vstack(([origin['lat'], origin['lng']], points))
+            demands = np.concatenate((np.zeros(1, dtype=np.int32), sizes))
 
             return CVRPProblem(problem_identifier=data['name'],
-                               location_idx=np.array(range(len(packages) + 1)),
-                               coords=np.array(coords),
+                               location_idx=np.arange(len(demands)),
+                               coords=coords,
                                vehicle_capacity=data['vehicle_capacity'],
                                num_vehicles=MAX_NUM_VEHICLES,
-                               max_deliveries=len(packages),
-                               demands=np.array(demands),
+                               max_deliveries=len(sizes),
+                               demands=demands,
                                depot_idx=0)
 
 
@@ -1,13 +1,18 @@
-from itertools import product, combinations
+import numpy as np
 
-from collections import defaultdict
-from typing import Dict, Tuple, Callable
+from functools import lru_cache
+from typing import Callable
+
+from dimod import BINARY, BinaryQuadraticModel
 
 from src.quantumrouting.types import CVRPProblem
 
 from src.quantumrouting.solvers.fullqubo import FullQuboParams
 
-from src.quantumrouting.distances import compute_distances
+# Objective terms (distances and capacity) are kept in single precision. Constraints and
+# the merged qubo stay in double precision: float32 can only step by 1-2 units around the
+# 1e7 constraint penalties, which would round away the costs added on the same entries.
+OBJECTIVE_DTYPE = np.float32
 
 """
 cost_example =
@@ -18,11 +23,37 @@ array([[0.  , 0.27, 0.86, 0.34],
 """
 
 
-def vrp_objective_function(problem: CVRPProblem, cost_const: int) -> Dict[Tuple, int]:
+def _vidx(step: int, node: int, num_nodes: int) -> int:
+    """Flat index of the (step, node) binary variable in the qubo matrix."""
+    return step * num_nodes + node
+
+
+@lru_cache(maxsize=None)
+def _variables_grid(steps: int, num_nodes: int) -> np.ndarray:
+    """Flat indexes of all (step, node) variables, shared between qubo builds."""
+    grid = _vidx(np.arange(steps)[:, None], np.arange(num_nodes)[None, :], num_nodes)
+    grid.flags.writeable = False
+    return grid
+
+
+def _empty_qubo(problem: CVRPProblem, dtype: type = np.float64) -> np.ndarray:
+    num_variables = problem.num_vehicles * problem.max_deliveries * len(problem.location_idx)
+    return np.zeros((num_variables, num_variables), dtype=dtype)
+
+
+def vrp_objective_function(problem: CVRPProblem, cost_const: int) -> np.ndarray:
 
-    distances = compute_distances(coords=problem.coords)
+    distances = problem.costs
 
-    variables = defaultdict(int)
+    num_nodes = len(problem.location_idx)
+    # Each vehicle route spans one step per delivery location.
+    if problem.max_deliveries < num_nodes - 1:
+        raise ValueError(
+            f"max_deliveries ({problem.max_deliveries}) must be at least the number of "
+            f"deliveries ({num_nodes - 1}) to build the qubo.")
+
+    grid = _variables_grid(problem.num_vehicles * problem.max_deliveries, num_nodes)
+    variables = _empty_qubo(problem, dtype=OBJECTIVE_DTYPE)
 
     start = 0
 
@@ -37,82 +68,99 @@ def vrp_objective_function(problem: CVRPProblem, cost_const: int) -> Dict[Tuple,
         # ((0, 0), (1, 0)): 0.0, ((0, 0), (1, 1)): 0.27,
         # ((0, 0), (1, 2)): 0.86, ((0, 0), (1, 3)): 0.34, ...)
         for step in range(min_final + 1, max_final):
-            for node1, node2 in product(problem.location_idx, problem.location_idx):
-                idx = ((step, node1), (step + 1, node2))
-                cost = distances[node1][node2]
-                variables[idx] += cost * cost_const
+            row = _vidx(step, 0, num_nodes)
+            col = _vidx(step + 1, 0, num_nodes)
+            variables[row:row + num_nodes, col:col + num_nodes] += distances * cost_const
 
         # First and Last destination to depot cost
-        for destination in problem.location_idx:
-            # Depot and first destination
-            # ((0, 0), (0, 0)): 0.0, ((0, 1), (0, 1)): 0.27,
-            # ((0, 2), (0, 2)): 0.86, ((0, 3), (0, 3)): 0.34,
-            # ((3, 0), (3, 0)): 0.0, ((3, 1), (3, 1)): 0.27
-            # ((3, 2), (3, 2)): 0.86, ((3, 3), (3, 3)): 0.34
-            idx = ((start, destination), (start, destination))
-            cost = distances[problem.depot_idx][destination]
-            variables[idx] += cost * cost_const
-
-            # Last destination and depot
-            # ((2, 0), (2, 0)): 0.0, ((2, 1), (2, 1)): 0.27
-            # ((2, 2), (2, 2)): 0.86,((2, 3), (2, 3)): 0.34
-            # ((5, 0), (5, 0)) 0.0, ((5, 1), (5, 1)): 0.27
-            # ((5, 2), (5, 2)): 0.86, ((5, 3), (5, 3)): 0.34
-            idx = ((max_final, destination), (max_final, destination))
-            cost = distances[destination][problem.depot_idx]
-            variables[idx] += cost_const * cost
+        # Depot and first destination
+        # ((0, 0), (0, 0)): 0.0, ((0, 1), (0, 1)): 0.27,
+        # ((0, 2), (0, 2)): 0.86, ((0, 3), (0, 3)): 0.34,
+        # ((3, 0), (3, 0)): 0.0, ((3, 1), (3, 1)): 0.27
+        # ((3, 2), (3, 2)): 0.86, ((3, 3), (3, 3)): 0.34
+        first = grid[start]
+        variables[first, first] += distances[problem.depot_idx, :] * cost_const
+
+        # Last destination and depot
+        # ((2, 0), (2, 0)): 0.0, ((2, 1), (2, 1)): 0.27
+        # ((2, 2), (2, 2)): 0.86,((2, 3), (2, 3)): 0.34
+        # ((5, 0), (5, 0)) 0.0, ((5, 1), (5, 1)): 0.27
+        # ((5, 2), (5, 2)): 0.86, ((5, 3), (5, 3)): 0.34
+        last = grid[max_final]
+        variables[last, last] += distances[:, problem.depot_idx] * cost_const
 
         start = max_final + 1
 
     return variables
 
 
-def cvrp_objective_function(problem: CVRPProblem, cost_const: int) -> Dict[Tuple, int]:
+def cvrp_objective_function(problem: CVRPProblem, cost_const: int) -> np.ndarray:
 
     variables = vrp_objective_function(problem=problem, cost_const=cost_const)
 
+    num_nodes = len(problem.location_idx)
+    customers = problem.location_idx[1:]
+
+    # Capacity optimization
+    # ((s1, d1), (s2, d2)) -> demand[d1] * demand[d2] / capacity ** 2, for s1 < s2 and d1 != d2
+    capacity = problem.vehicle_capacity
+    demands = problem.demands[customers]
+    capacity_cost = np.zeros((num_nodes, num_nodes), dtype=OBJECTIVE_DTYPE)
+    capacity_cost[np.ix_(customers, customers)] = np.outer(demands, demands) / capacity ** 2 * cost_const
+    np.fill_diagonal(capacity_cost, 0)
+
+    later_steps = np.triu(np.ones((num_nodes - 1, num_nodes - 1), dtype=OBJECTIVE_DTYPE), k=1)
+    capacity_block = np.kron(later_steps, capacity_cost)
+
     start = 0
 
     for vehicle in range(problem.num_vehicles):
         max_final = start + len(problem.location_idx) - 2
 
-        # Capacity optimization
-        capacity = problem.vehicle_capacity
-        for (d1, d2) in combinations(problem.location_idx[1:], 2):
-            for (s1, s2) in combinations(range(start, max_final + 1), 2):
-                idx = ((s1, d1), (s2, d2))
-                idx2 = ((s1, d2), (s2, d1))
-                cost = problem.demands[d1] * problem.demands[d2] / capacity ** 2
-                variables[idx] += cost_const * cost
-                variables[idx2] += cost_const * cost
+        first = _vidx(start, 0, num_nodes)
+        last = _vidx(max_final + 1, 0, num_nodes)
+        variables[first:last, first:last] += capacity_block
 
         start = max_final + 1
 
     return variables
 
 
-def constraints(problem: CVRPProblem, constraint_const: int) -> Dict[Tuple, int]:
-    constraints_dict = defaultdict(int)
+def constraints(problem: CVRPProblem, constraint_const: int) -> np.ndarray:
+    constraints_matrix = _empty_qubo(problem)
 
+    num_nodes = len(problem.location_idx)
     steps = problem.num_vehicles*problem.max_deliveries
 
+    grid = _variables_grid(steps, num_nodes)
+
+    # Only the upper triangle is written, pairs inside a group are penalised once with 2 * A.
     # One step for one destination.
-    for dest in problem.location_idx[1:]:
-        variables = [(step, dest) for step in range(steps)]
-        for var in variables:
-            constraints_dict[(var, var)] -= 2 * constraint_const
-        for var in product(variables, variables):
-            constraints_dict[var] += constraint_const
+    variables = grid[:, problem.location_idx[1:]]
+    first_steps, second_steps = np.triu_indices(steps, k=1)
+    constraints_matrix[variables[first_steps], variables[second_steps]] += 2 * constraint_const
+    constraints_matrix[variables, variables] -= constraint_const
 
     # Stay in depot..
-    for step in range(0, int(steps)):
-        variables = [(step, dest) for dest in problem.location_idx]
-        for var in variables:
-            constraints_dict[(var, var)] -= 2 * constraint_const
-        for var in product(variables, variables):
-            constraints_dict[var] += constraint_const
+    first_nodes, second_nodes = np.triu_indices(num_nodes, k=1)
+    constraints_matrix[grid[:, first_nodes], grid[:, second_nodes]] += 2 * constraint_const
+    constraints_matrix[grid, grid] -= constraint_const
+
+    return constraints_matrix
+
 
-    return constraints_dict
+def _merge_qubo(objective_repr: np.ndarray, constraints_repr: np.ndarray) -> BinaryQuadraticModel:
+    """Add the objective into the float64 constraints in place and load it as a binary quadratic model."""
+    qubo = constraints_repr
+    qubo += objective_repr
+    rows, cols = np.nonzero(qubo)
+    off_diagonal = rows != cols
+    rows, cols = rows[off_diagonal], cols[off_diagonal]
+    return BinaryQuadraticModel.from_numpy_vectors(
+        linear=qubo.diagonal(),
+        quadratic=(rows, cols, qubo[rows, cols]),
+        offset=0.0,
+        vartype=BINARY)
 
 
 def wrap_vrp_qubo_problem(
@@ -133,13 +181,10 @@ def wrap_vrp_qubo_problem(
 
     """
 
-    def _wrap_vrp_qubo_problem(problem: CVRPProblem) -> Dict[Tuple[int, int], int]:
+    def _wrap_vrp_qubo_problem(problem: CVRPProblem) -> BinaryQuadraticModel:
         objective_repr = vrp_objective_function(problem=problem, cost_const=params.cost_const)
         constraints_repr = constraints(problem=problem, constraint_const=params.constraint_const)
-        return {
-            k: objective_repr.get(k, 0) + constraints_repr.get(k, 0)
-            for k in set(objective_repr) | set(constraints_repr)
-        }
+        return _merge_qubo(objective_repr, constraints_repr)
 
     return _wrap_vrp_qubo_problem
 
@@ -163,13 +208,10 @@ def wrap_cvrp_qubo_problem(
 
     """
 
-    def _wrap_cvrp_qubo_problem(problem: CVRPProblem) -> Dict[Tuple[int, int], int]:
+    def _wrap_cvrp_qubo_problem(problem: CVRPProblem) -> BinaryQuadraticModel:
         objective_repr = cvrp_objective_function(problem=problem, cost_const=params.cost_const)
         constraints_repr = constraints(problem=problem, constraint_const=params.constraint_const)
-        return {
-            k: objective_repr.get(k, 0) + constraints_repr.get(k, 0)
-            for k in set(objective_repr) | set(constraints_repr)
-        }
+        return _merge_qubo(objective_repr, constraints_repr)
 
     return _wrap_cvrp_qubo_problem
 
@@ -3,6 +3,7 @@ import pytest
 import numpy as np
 
 from src.quantumrouting.solvers import lk3
+from src.quantumrouting.solvers.lk3 import _unwrap_lkh_solution
 
 from src.quantumrouting.types import CVRPProblem
 
@@ -43,3 +44,21 @@ def test_vrp_lkh_solver(cvrp_problem):
     assert int(result.cost) == 12262
 
 
+def test_unwrap_lkh_solution_two_vehicles(cvrp_problem):
+    # LKH does not know max_deliveries, routes may hold more deliveries than it.
+    cvrp_problem.num_vehicles = 2
+    cvrp_problem.max_deliveries = 1
+
+    # 1-indexed tour, depot is 1 and 7 is the dummy depot splitting the routes.
+    solution = [[1, 3, 4, 2, 7, 6, 5]]
+
+    result = _unwrap_lkh_solution(cvrp_problem, solution)
+
+    expected_routes = np.array([
+        [0, 2, 3, 1, 0, 0, 0],
+        [0, 5, 4, 0, 0, 0, 0]
+    ])
+
+    assert (result.routes == expected_routes).all()
+    assert result.cost == pytest.approx(11841.439508248637 + 11591.398743862906)
+    assert (result.total_demands == np.array([27, 13])).all()
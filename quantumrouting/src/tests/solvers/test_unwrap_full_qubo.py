@@ -0,0 +1,78 @@
+import pytest
+
+import numpy as np
+from dimod import SampleSet
+
+from src.quantumrouting.solvers.fullqubo import _unwrap_fullqubo_solution
+from src.quantumrouting.types import CVRPProblem
+
+
+@pytest.fixture
+def cvrp_problem():
+    max_num_vehicles = 1
+
+    coords = [
+        [-15.6570138544452, -47.802664728268745],
+        [-15.65879313293694, -47.7496622016347],
+        [-15.651440380492554, -47.75887552060412],
+        [-15.651207309372888, -47.755018806591394],
+        [-15.648706444367969, -47.758785390289965],
+        [-15.66047286919706, -47.75284167302011]
+    ]
+    return CVRPProblem(problem_identifier='bla',
+                       location_idx=np.array([0, 1, 2, 3, 4, 5]),
+                       coords=np.array(coords),
+                       vehicle_capacity=100,
+                       num_vehicles=max_num_vehicles,
+                       max_deliveries=5,
+                       demands=np.array([0, 10, 10, 7, 3, 10]),
+                       depot_idx=0)
+
+
+@pytest.fixture
+def cvrp_problem_two_vehicles(cvrp_problem):
+    cvrp_problem.num_vehicles = 2
+    return cvrp_problem
+
+
+def to_sample_set(assignment, problem):
+    # Flat (step, dest) variables, only the assigned ones are set.
+    num_nodes = len(problem.location_idx)
+    num_variables = problem.num_vehicles * problem.max_deliveries * num_nodes
+    sample = np.zeros(num_variables, dtype=np.int8)
+    for step, dest in assignment:
+        sample[step * num_nodes + dest] = 1
+    return SampleSet.from_samples(sample, vartype='BINARY', energy=[0])
+
+
+def test_unwrap_full_qubo_solution(cvrp_problem):
+    assignment = [(0, 4), (1, 2), (2, 3), (3, 1), (4, 5)]
+
+    result = _unwrap_fullqubo_solution(
+        problem=cvrp_problem, result=to_sample_set(assignment, cvrp_problem))
+
+    assert result.problem_identifier == 'bla'
+    assert (result.routes == np.array([[0, 4, 2, 3, 1, 5, 0]])).all()
+    assert result.cost == pytest.approx(12262.691241279905)
+    assert (result.total_demands == np.array([40])).all()
+
+
+def test_unwrap_full_qubo_solution_two_vehicles(cvrp_problem_two_vehicles):
+    # Stays in depot are skipped, routes are padded with the depot.
+    assignment = [
+        (0, 2), (1, 0), (2, 1), (3, 0), (4, 0),
+        (5, 3), (6, 4), (7, 5), (8, 0), (9, 0)
+    ]
+
+    result = _unwrap_fullqubo_solution(
+        problem=cvrp_problem_two_vehicles,
+        result=to_sample_set(assignment, cvrp_problem_two_vehicles))
+
+    expected_routes = np.array([
+        [0, 2, 1, 0, 0, 0, 0],
+        [0, 3, 4, 5, 0, 0, 0]
+    ])
+
+    assert (result.routes == expected_routes).all()
+    assert result.cost == pytest.approx(11688.900972531084 + 12435.283404851072)
+    assert (result.total_demands == np.array([20, 20])).all()
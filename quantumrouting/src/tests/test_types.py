@@ -28,4 +28,6 @@ def test_cvrp_from_file():
     assert (problem.demands == np.array(expected_demands)).all()
     assert problem.max_deliveries == 5
     assert problem.depot_idx == 0
+    assert problem.costs.shape == (6, 6)
+    assert (problem.costs == problem.costs.T).all()
 
@@ -2,8 +2,14 @@
 import pytest
 import numpy as np
 
+from src.quantumrouting.solvers.fullqubo import FullQuboParams
 from src.quantumrouting.types import CVRPProblem
-from src.quantumrouting.wrappers.qubo import vrp_objective_function, constraints
+from src.quantumrouting.wrappers.qubo import (
+    vrp_objective_function,
+    cvrp_objective_function,
+    constraints,
+    wrap_vrp_qubo_problem
+)
 
 
 @pytest.fixture
@@ -44,6 +50,59 @@ def cvrp_problem_two_vehicles():
                        depot_idx=0)
 
 
+@pytest.fixture
+def cvrp_problem_four_locations():
+    max_num_vehicles = 1
+
+    coords = [
+        [-15.6570138544452, -47.802664728268745],
+        [-15.65879313293694, -47.7496622016347],
+        [-15.651440380492554, -47.75887552060412],
+        [-15.651207309372888, -47.755018806591394],
+    ]
+    return CVRPProblem(problem_identifier='bla',
+                       location_idx=np.array([0, 1, 2, 3]),
+                       coords=np.array(coords),
+                       vehicle_capacity=100,
+                       num_vehicles=max_num_vehicles,
+                       max_deliveries=3,
+                       demands=np.array([5, 10, 20, 40]),
+                       depot_idx=0)
+
+
+@pytest.fixture
+def cvrp_problem_four_locations_two_vehicles():
+    max_num_vehicles = 2
+
+    coords = [
+        [-15.6570138544452, -47.802664728268745],
+        [-15.65879313293694, -47.7496622016347],
+        [-15.651440380492554, -47.75887552060412],
+        [-15.651207309372888, -47.755018806591394],
+    ]
+    return CVRPProblem(problem_identifier='bla',
+                       location_idx=np.array([0, 1, 2, 3]),
+                       coords=np.array(coords),
+                       vehicle_capacity=100,
+                       num_vehicles=max_num_vehicles,
+                       max_deliveries=3,
+                       demands=np.array([5, 10, 20, 40]),
+                       depot_idx=0)
+
+
+def to_matrix(qubo, problem):
+    num_nodes = len(problem.location_idx)
+    size = problem.num_vehicles * problem.max_deliveries * num_nodes
+    matrix = np.zeros((size, size))
+    for ((s1, d1), (s2, d2)), value in qubo.items():
+        matrix[s1 * num_nodes + d1, s2 * num_nodes + d2] += value
+    return matrix
+
+
+def to_upper_triangular(matrix):
+    return np.triu(matrix + matrix.T) - np.diag(np.diag(matrix))
+
+
 def test_vrp_objective_function(cvrp_problem):
     # For for each destination: ((i1, j), (i2, j)) -> customer j in position i1 (i2)
     expected_qubo = {
@@ -65,7 +124,7 @@ def test_vrp_objective_function(cvrp_problem):
     }
 
     result = vrp_objective_function(problem=cvrp_problem, cost_const=1)
-    assert expected_qubo == result
+    assert np.allclose(to_matrix(expected_qubo, cvrp_problem), result)
 
 
 def test_vrp_objective_function_two_vehicles(cvrp_problem_two_vehicles):
@@ -104,8 +163,65 @@ def test_vrp_objective_function_two_vehicles(cvrp_problem_two_vehicles):
     }
 
     result = vrp_objective_function(problem=cvrp_problem_two_vehicles, cost_const=1)
-    assert expected_qubo == result
+    assert np.allclose(to_matrix(expected_qubo, cvrp_problem_two_vehicles), result)
+
 
+def test_cvrp_objective_function(cvrp_problem_four_locations):
+    # Capacity term on top of the vrp objective:
+    # ((s1, d1), (s2, d2)) -> demand[d1] * demand[d2] / capacity ** 2, only for s1 < s2,
+    # d1 != d2 and customers (the depot demand is ignored).
+    expected_capacity_qubo = {
+        ((0, 1), (1, 2)): 2, ((0, 1), (1, 3)): 4,
+        ((0, 1), (2, 2)): 2, ((0, 1), (2, 3)): 4,
+        ((0, 2), (1, 1)): 2, ((0, 2), (1, 3)): 8,
+        ((0, 2), (2, 1)): 2, ((0, 2), (2, 3)): 8,
+        ((0, 3), (1, 1)): 4, ((0, 3), (1, 2)): 8,
+        ((0, 3), (2, 1)): 4, ((0, 3), (2, 2)): 8,
+        ((1, 1), (2, 2)): 2, ((1, 1), (2, 3)): 4,
+        ((1, 2), (2, 1)): 2, ((1, 2), (2, 3)): 8,
+        ((1, 3), (2, 1)): 4, ((1, 3), (2, 2)): 8
+    }
+
+    result = cvrp_objective_function(problem=cvrp_problem_four_locations, cost_const=100)
+    capacity_result = result - vrp_objective_function(problem=cvrp_problem_four_locations, cost_const=100)
+    assert np.allclose(to_matrix(expected_capacity_qubo, cvrp_problem_four_locations),
+                       capacity_result, rtol=0, atol=0.1)
+
+
+def test_cvrp_objective_function_two_vehicles(cvrp_problem_four_locations_two_vehicles):
+    # Capacity term is only applied between steps of the same vehicle.
+    expected_capacity_qubo = {
+        ((0, 1), (1, 2)): 2, ((0, 1), (1, 3)): 4,
+        ((0, 1), (2, 2)): 2, ((0, 1), (2, 3)): 4,
+        ((0, 2), (1, 1)): 2, ((0, 2), (1, 3)): 8,
+        ((0, 2), (2, 1)): 2, ((0, 2), (2, 3)): 8,
+        ((0, 3), (1, 1)): 4, ((0, 3), (1, 2)): 8,
+        ((0, 3), (2, 1)): 4, ((0, 3), (2, 2)): 8,
+        ((1, 1), (2, 2)): 2, ((1, 1), (2, 3)): 4,
+        ((1, 2), (2, 1)): 2, ((1, 2), (2, 3)): 8,
+        ((1, 3), (2, 1)): 4, ((1, 3), (2, 2)): 8,
+        ((3, 1), (4, 2)): 2, ((3, 1), (4, 3)): 4,
+        ((3, 1), (5, 2)): 2, ((3, 1), (5, 3)): 4,
+        ((3, 2), (4, 1)): 2, ((3, 2), (4, 3)): 8,
+        ((3, 2), (5, 1)): 2, ((3, 2), (5, 3)): 8,
+        ((3, 3), (4, 1)): 4, ((3, 3), (4, 2)): 8,
+        ((3, 3), (5, 1)): 4, ((3, 3), (5, 2)): 8,
+        ((4, 1), (5, 2)): 2, ((4, 1), (5, 3)): 4,
+        ((4, 2), (5, 1)): 2, ((4, 2), (5, 3)): 8,
+        ((4, 3), (5, 1)): 4, ((4, 3), (5, 2)): 8
+    }
+
+    problem = cvrp_problem_four_locations_two_vehicles
+    result = cvrp_objective_function(problem=problem, cost_const=100)
+    capacity_result = result - vrp_objective_function(problem=problem, cost_const=100)
+    assert np.allclose(to_matrix(expected_capacity_qubo, problem), capacity_result, rtol=0, atol=0.1)
+
+
+def test_vrp_objective_function_too_few_deliveries(cvrp_problem_four_locations):
+    cvrp_problem_four_locations.max_deliveries = 2
+
+    with pytest.raises(ValueError, match="max_deliveries"):
+        vrp_objective_function(problem=cvrp_problem_four_locations, cost_const=1)
 
 def test_constraints_qubo(cvrp_problem):
     # For for each destination: ((i1, j), (i2, j)) -> customer j in position i1 (i2)
@@ -136,7 +252,7 @@ def test_constraints_qubo(cvrp_problem):
 
     result = constraints(problem=cvrp_problem, constraint_const=1)
 
-    assert expected_qubo == result
+    assert (to_upper_triangular(to_matrix(expected_qubo, cvrp_problem)) == result).all()
 
 
 def test_constraints_qubo_two_vehicles(cvrp_problem_two_vehicles):
@@ -176,4 +292,19 @@ def test_constraints_qubo_two_vehicles(cvrp_problem_two_vehicles):
 
     result = constraints(problem=cvrp_problem_two_vehicles, constraint_const=1)
 
-    assert expected_qubo == result
+    assert (to_upper_triangular(to_matrix(expected_qubo, cvrp_problem_two_vehicles)) == result).all()
+
+
+def test_wrap_vrp_qubo_problem_keeps_depot_costs(cvrp_problem):
+    # Depot legs sit on the diagonal next to the -2A one-hot penalties of a delivery,
+    # they must survive the merge with the default constraint multiplier.
+    params = FullQuboParams()
+    bqm = wrap_vrp_qubo_problem(params=params)(problem=cvrp_problem)
+
+    penalty = -2 * params.constraint_const
+    # Depot to first destination: (0, 1) and (0, 2)
+    assert bqm.get_linear(1) - penalty == pytest.approx(5678.349666395941, abs=1e-3)
+    assert bqm.get_linear(2) - penalty == pytest.approx(4729.312006109361, abs=1e-3)
+    # Last destination to depot: (1, 1) and (1, 2)
+    assert bqm.get_linear(4) - penalty == pytest.approx(5678.349666395941, abs=1e-3)
+    assert bqm.get_linear(5) - penalty == pytest.approx(4729.312006109361, abs=1e-3)